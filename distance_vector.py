@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import sys
+
 class Router:
     def __init__(self, name, all_routers):
         self.name = name                    
@@ -172,6 +174,14 @@ class Router:
         print()
 
 def main():
+    # Optional: record table changes with --trace FILE (query with trace_store.py)
+    trace_path = None
+    if len(sys.argv) == 3 and sys.argv[1] == "--trace":
+        trace_path = sys.argv[2]
+    elif len(sys.argv) != 1:
+        print(f"usage: {sys.argv[0]} [--trace FILE] < input", file=sys.stderr)
+        sys.exit(2)
+    
     # Step 1: Read router names
     router_names = []
     while True:
@@ -180,6 +190,19 @@ def main():
             break
         router_names.append(line)
     
+    # Create the trace before anything else can fail, so a partial run
+    # still gets its index written
+    trace = None
+    if trace_path:
+        from trace_store import TraceWriter
+        trace = TraceWriter(trace_path, router_names)
+    try:
+        simulate(router_names, trace)
+    finally:
+        if trace:
+            trace.close()
+
+def simulate(router_names, trace):
     # Step 2: Read initial topology 
     links = []
     while True:
@@ -207,6 +230,8 @@ def main():
     # Step 6: Print initial distance tables (t=0)
     for name in sorted(router_names):
         routers[name].print_distance_table(0)
+    if trace:
+        trace.record(0, routers)
         
     # Step 7: Run Distance Vector algorithm until convergence
     step = 0
@@ -234,6 +259,8 @@ def main():
         # Print distance tables for this step
         for name in sorted(router_names):
             routers[name].print_distance_table(step)
+        if trace:
+            trace.record(step, routers)
             
         # Save for convergence check
         last_distance_vectors = distance_vectors
@@ -278,6 +305,8 @@ def main():
         step = 3  # Start at t=3 after topology change
         for name in sorted(router_names):
             routers[name].print_distance_table(step)
+        if trace:
+            trace.record(step, routers)
         
         # Run algorithm again until convergence
         last_distance_vectors = {}
@@ -303,6 +332,8 @@ def main():
             step += 1
             for name in sorted(router_names):
                 routers[name].print_distance_table(step)
+            if trace:
+                trace.record(step, routers)
                 
             # Save for convergence check
             last_distance_vectors = distance_vectors
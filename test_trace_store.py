@@ -0,0 +1,137 @@
+"""Tests for trace_store, checked against the printed output of both programs"""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from trace_store import TraceReader, format_distance_table, main
+
+ROOT = Path(__file__).resolve().parent
+PROGRAMS = ["distance_vector.py", "poisoned_reverse.py"]
+# The chain converges in more than 3 steps, so t=3 and t=4 are printed
+# twice: once before the update and once after the restart at t=3
+CHAIN_INPUT = "A\nB\nC\nD\nE\nSTART\nA B 1\nB C 1\nC D 1\nD E 1\nUPDATE\nA E 1\nEND\n"
+INPUTS = {
+    "test_input": (ROOT / "test_input.txt").read_text(),
+    "chain": CHAIN_INPUT,
+}
+TABLE_BLOCK = re.compile(r"(Distance Table of router (\w+) at t=(\d+):\n(?:.+\n)+)\n")
+
+
+def run_traced(program, stdin, trace_path):
+    result = subprocess.run(
+        [sys.executable, str(ROOT / program), "--trace", str(trace_path)],
+        input=stdin, capture_output=True, text=True, check=True, cwd=ROOT)
+    return result.stdout
+
+
+def printed_frames(stdout, router_count):
+    """Split stdout into frames of {router: (step, text, costs)}"""
+    frames = []
+    for i, (text, name, step) in enumerate(TABLE_BLOCK.findall(stdout)):
+        if i % router_count == 0:
+            frames.append({})
+        lines = text.splitlines()
+        vias = lines[1].split()
+        costs = {}
+        for row in lines[2:]:
+            dest, *cells = row.split()
+            costs[dest] = {
+                via: float('inf') if cell == "INF" else int(cell)
+                for via, cell in zip(vias, cells)
+            }
+        frames[-1][name] = (int(step), text, costs)
+    return frames
+
+
+def expected_last_change(frames, router, dest, until_frame):
+    """Replay every printed table to find the last best-route change"""
+    route = (None, float('inf'))
+    change = None
+    for frame in range(until_frame + 1):
+        step, _, costs = frames[frame][router]
+        best = (None, float('inf'))
+        for via in sorted(costs[dest]):
+            if costs[dest][via] < best[1]:
+                best = (via, costs[dest][via])
+        if best != route:
+            change = (frame, step, route, best)
+            route = best
+    return change
+
+
+@pytest.fixture(params=[(p, i) for p in PROGRAMS for i in INPUTS],
+                ids=lambda param: f"{param[0]}-{param[1]}")
+def traced_run(request, tmp_path):
+    program, input_name = request.param
+    trace_path = tmp_path / "run.dvtrace"
+    stdout = run_traced(program, INPUTS[input_name], trace_path)
+    reader = TraceReader(trace_path)
+    yield reader, printed_frames(stdout, len(reader.router_names))
+    reader.close()
+
+
+def test_every_frame_matches_printed_tables(traced_run):
+    reader, frames = traced_run
+    assert reader.step_labels == [next(iter(f.values()))[0] for f in frames]
+    for frame, tables in enumerate(frames):
+        for name, (step, text, _) in tables.items():
+            table = reader.distance_table(name, frame=frame)
+            assert format_distance_table(name, reader.router_names, table, step) == text
+
+
+def test_last_route_change_matches_replay(traced_run):
+    reader, frames = traced_run
+    for router in reader.router_names:
+        for dest in reader.router_names:
+            if dest == router:
+                continue
+            for frame in range(len(frames)):
+                assert (reader.last_route_change(router, dest, frame=frame)
+                        == expected_last_change(frames, router, dest, frame))
+            assert (reader.last_route_change(router, dest)
+                    == expected_last_change(frames, router, dest, len(frames) - 1))
+
+
+def test_repeated_step_labels_are_reachable_by_frame(tmp_path, capsys):
+    trace_path = tmp_path / "chain.dvtrace"
+    run_traced("distance_vector.py", CHAIN_INPUT, trace_path)
+    reader = TraceReader(trace_path)
+    assert reader.step_labels == [0, 1, 2, 3, 4, 3, 4, 5]
+
+    # A step label means its latest frame; the pre-update t=3 is frame 3
+    assert reader.distance_table("A", step=3)["E"]["E"] == 1
+    assert reader.distance_table("A", frame=3)["E"]["E"] == float('inf')
+    assert reader.last_route_change("A", "E", step=4) == (5, 3, ("B", 4), ("E", 1))
+    assert reader.last_route_change("A", "E", frame=4) == (3, 3, (None, float('inf')), ("B", 4))
+    reader.close()
+
+    assert main([str(trace_path), "show", "A", "--frame", "3"]) == 0
+    assert "E    4    INF  INF  INF  " in capsys.readouterr().out
+    assert main([str(trace_path), "last-change", "A", "E", "--frame", "4"]) == 0
+    assert capsys.readouterr().out == (
+        "Route of router A to E last changed at t=3 (frame 3): INF,INF -> B,4\n")
+
+
+def test_partial_run_still_writes_index(tmp_path):
+    trace_path = tmp_path / "partial.dvtrace"
+    bad_update = INPUTS["test_input"].replace("X Z 1", "X Z oops")
+    result = subprocess.run(
+        [sys.executable, str(ROOT / "distance_vector.py"), "--trace", str(trace_path)],
+        input=bad_update, capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode != 0
+    reader = TraceReader(trace_path)
+    assert reader.step_labels == [0, 1, 2]
+    reader.close()
+
+
+@pytest.mark.parametrize("content", [None, b"", b"DVTRACE1", b"not a trace at all"])
+def test_unreadable_trace_reports_error(tmp_path, capsys, content):
+    trace_path = tmp_path / "bad.dvtrace"
+    if content is not None:
+        trace_path.write_bytes(content)
+    assert main([str(trace_path), "steps"]) == 1
+    assert capsys.readouterr().err.startswith("error: ")
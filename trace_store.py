@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Delta-encoded trace of distance table changes, with a query tool.
+
+Layout of a trace file (all integers little-endian):
+
+    header   b"DVTRACE1", u16 router count, then per router u16 length + name
+    records  fixed 14-byte change records: u32 frame, u16 router, u16 dest,
+             u16 next_hop, i32 cost (-1 means INF)
+    index    u32 frame count + u32 step label per frame, then per router
+             u32 record count + u32 record numbers
+    footer   u64 index offset, b"DVTRIDX1"
+
+A frame is one snapshot of every router (one printed t=). Frames are
+numbered in the order they were recorded, because step labels can repeat
+or go backwards when the simulation restarts at t=3 after an update.
+Queries by step label use the latest frame with that label; pass a frame
+number to reach an earlier one.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+HEADER_MAGIC = b"DVTRACE1"
+FOOTER_MAGIC = b"DVTRIDX1"
+RECORD = struct.Struct("<IHHHi")
+FOOTER = struct.Struct("<Q8s")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+INF_COST = -1
+
+
+def _encode_cost(cost):
+    return INF_COST if cost == float('inf') else int(cost)
+
+
+def _decode_cost(cost):
+    return float('inf') if cost == INF_COST else cost
+
+
+def _best_route(costs):
+    """Best (next_hop, cost) using the same tie-break as print_routing_table"""
+    best_cost = float('inf')
+    best_next_hop = None
+    for next_hop in sorted(costs):
+        if costs[next_hop] < best_cost:
+            best_cost = costs[next_hop]
+            best_next_hop = next_hop
+    return best_next_hop, best_cost
+
+
+class TraceWriter:
+    def __init__(self, path, router_names):
+        self.router_names = list(router_names)
+        self.router_ids = {name: i for i, name in enumerate(self.router_names)}
+        self.file = open(path, "wb")
+        self.step_labels = []
+        self.router_records = [[] for _ in self.router_names]
+        self.record_count = 0
+        # Last recorded table per router, starting from the all-INF baseline
+        self.last_tables = {}
+        for name in self.router_names:
+            self.last_tables[name] = {}
+            for dest in self.router_names:
+                if dest != name:
+                    self.last_tables[name][dest] = {
+                        next_hop: float('inf')
+                        for next_hop in self.router_names if next_hop != name
+                    }
+
+        self.file.write(HEADER_MAGIC)
+        self.file.write(U16.pack(len(self.router_names)))
+        for name in self.router_names:
+            encoded = name.encode("utf-8")
+            self.file.write(U16.pack(len(encoded)))
+            self.file.write(encoded)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, step, routers):
+        """Append the changes since the previous snapshot as one frame"""
+        frame = len(self.step_labels)
+        self.step_labels.append(step)
+
+        for name in self.router_names:
+            router_id = self.router_ids[name]
+            last_table = self.last_tables[name]
+            table = routers[name].distance_table
+            for dest in last_table:
+                for next_hop, old_cost in last_table[dest].items():
+                    cost = table[dest][next_hop]
+                    if cost != old_cost:
+                        self.file.write(RECORD.pack(
+                            frame, router_id, self.router_ids[dest],
+                            self.router_ids[next_hop], _encode_cost(cost)))
+                        self.router_records[router_id].append(self.record_count)
+                        self.record_count += 1
+                        last_table[dest][next_hop] = cost
+
+    def close(self):
+        """Write the index and footer, then close the file"""
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(U32.pack(len(self.step_labels)))
+        for step in self.step_labels:
+            self.file.write(U32.pack(step))
+        for records in self.router_records:
+            self.file.write(U32.pack(len(records)))
+            for record_number in records:
+                self.file.write(U32.pack(record_number))
+        self.file.write(FOOTER.pack(index_offset, FOOTER_MAGIC))
+        self.file.close()
+
+
+class TraceReader:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{path} is empty")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index(path)
+        except (ValueError, struct.error):
+            self.data.close()
+            raise
+
+    def _read_index(self, path):
+        if self.data[:len(HEADER_MAGIC)] != HEADER_MAGIC:
+            raise ValueError(f"{path} is not a distance table trace")
+        if len(self.data) < len(HEADER_MAGIC) + U16.size + FOOTER.size:
+            raise ValueError(f"{path} has no index (was the trace closed?)")
+        index_offset, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != FOOTER_MAGIC:
+            raise ValueError(f"{path} has no index (was the trace closed?)")
+
+        # Header: router names
+        offset = len(HEADER_MAGIC)
+        (router_count,) = U16.unpack_from(self.data, offset)
+        offset += U16.size
+        self.router_names = []
+        for _ in range(router_count):
+            (length,) = U16.unpack_from(self.data, offset)
+            offset += U16.size
+            self.router_names.append(self.data[offset:offset + length].decode("utf-8"))
+            offset += length
+        self.records_offset = offset
+
+        # Index: step label per frame, then record numbers per router
+        offset = index_offset
+        (frame_count,) = U32.unpack_from(self.data, offset)
+        offset += U32.size
+        self.step_labels = list(struct.unpack_from(f"<{frame_count}I", self.data, offset))
+        offset += frame_count * U32.size
+        self.router_records = {}
+        for name in self.router_names:
+            (count,) = U32.unpack_from(self.data, offset)
+            offset += U32.size
+            self.router_records[name] = (offset, count)
+            offset += count * U32.size
+
+    def close(self):
+        self.data.close()
+
+    def frame_for_step(self, step):
+        """Latest frame recorded with the given step label"""
+        for frame in range(len(self.step_labels) - 1, -1, -1):
+            if self.step_labels[frame] == step:
+                return frame
+        raise KeyError(f"no snapshot recorded at t={step}")
+
+    def resolve_frame(self, step=None, frame=None):
+        """Frame addressed by a frame number or a step label (None if neither)"""
+        if frame is not None:
+            if not 0 <= frame < len(self.step_labels):
+                raise KeyError(f"no frame {frame} (trace has {len(self.step_labels)} frames)")
+            return frame
+        if step is not None:
+            return self.frame_for_step(step)
+        return None
+
+    def iter_changes(self, router_name, until_frame=None):
+        """Yield (frame, dest, next_hop, cost) for one router in frame order"""
+        if router_name not in self.router_records:
+            raise KeyError(f"unknown router {router_name}")
+        offset, count = self.router_records[router_name]
+        for i in range(count):
+            (record_number,) = U32.unpack_from(self.data, offset + i * U32.size)
+            frame, _, dest, next_hop, cost = RECORD.unpack_from(
+                self.data, self.records_offset + record_number * RECORD.size)
+            if until_frame is not None and frame > until_frame:
+                break
+            yield frame, self.router_names[dest], self.router_names[next_hop], _decode_cost(cost)
+
+    def distance_table(self, router_name, step=None, frame=None):
+        """Reconstruct a router's distance table as printed at t=step or in frame
+
+        Without either, the table at the end of the trace is returned.
+        """
+        frame = self.resolve_frame(step, frame)
+        if router_name not in self.router_records:
+            raise KeyError(f"unknown router {router_name}")
+        table = {}
+        for dest in self.router_names:
+            if dest != router_name:
+                table[dest] = {
+                    next_hop: float('inf')
+                    for next_hop in self.router_names if next_hop != router_name
+                }
+        for _, dest, next_hop, cost in self.iter_changes(router_name, frame):
+            table[dest][next_hop] = cost
+        return table
+
+    def last_route_change(self, router_name, dest_name, step=None, frame=None):
+        """When router's best route to dest last changed, up to t=step or frame
+
+        Returns (frame, step, old_route, new_route) with routes as
+        (next_hop, cost), or None if the route never changed from unreachable.
+        """
+        if dest_name == router_name or dest_name not in self.router_names:
+            raise KeyError(f"{dest_name} is not a destination of {router_name}")
+        until_frame = self.resolve_frame(step, frame)
+
+        costs = {n: float('inf') for n in self.router_names if n != router_name}
+        route = (None, float('inf'))
+        last_change = None
+        pending_frame = None
+        for frame, dest, next_hop, cost in self.iter_changes(router_name, until_frame):
+            if dest != dest_name:
+                continue
+            if pending_frame is not None and frame != pending_frame:
+                # All changes of the previous frame are applied, compare routes
+                new_route = _best_route(costs)
+                if new_route != route:
+                    last_change = (pending_frame, self.step_labels[pending_frame], route, new_route)
+                    route = new_route
+            costs[next_hop] = cost
+            pending_frame = frame
+        if pending_frame is not None:
+            new_route = _best_route(costs)
+            if new_route != route:
+                last_change = (pending_frame, self.step_labels[pending_frame], route, new_route)
+        return last_change
+
+
+def format_distance_table(router_name, router_names, table, step):
+    """Format a distance table exactly like Router.print_distance_table"""
+    lines = [f"Distance Table of router {router_name} at t={step}:"]
+    destinations = sorted([d for d in router_names if d != router_name])
+    lines.append("     " + "    ".join(f"{dest}" for dest in destinations) + "    ")
+    for next_hop in destinations:
+        row = f"{next_hop}    "
+        for dest in destinations:
+            cost = table[next_hop][dest]
+            if cost == float('inf'):
+                row += "INF  "
+            else:
+                row += f"{int(cost)}    "
+        lines.append(row)
+    return "\n".join(lines) + "\n"
+
+
+def _format_route(route):
+    next_hop, cost = route
+    if cost == float('inf'):
+        return "INF,INF"
+    return f"{next_hop},{int(cost)}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query a distance table trace")
+    parser.add_argument("trace", help="trace file written with --trace")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("steps", help="list recorded frames and their step labels")
+
+    show = commands.add_parser("show", help="print a router's distance table at a step")
+    show.add_argument("router")
+    show.add_argument("step", type=int, nargs="?",
+                      help="step label, resolved to its latest frame")
+    show.add_argument("--frame", type=int, help="frame number, as listed by steps")
+
+    last_change = commands.add_parser(
+        "last-change", help="when a router's route to a destination last changed")
+    last_change.add_argument("router")
+    last_change.add_argument("dest")
+    last_change.add_argument("step", type=int, nargs="?",
+                             help="only consider changes up to this step (default: end)")
+    last_change.add_argument("--frame", type=int,
+                             help="only consider changes up to this frame")
+
+    args = parser.parse_args(argv)
+    if args.command == "show" and (args.step is None) == (args.frame is None):
+        parser.error("show needs exactly one of STEP or --frame")
+    if args.command == "last-change" and args.step is not None and args.frame is not None:
+        parser.error("last-change takes STEP or --frame, not both")
+
+    reader = None
+    try:
+        reader = TraceReader(args.trace)
+        if args.command == "steps":
+            for frame, step in enumerate(reader.step_labels):
+                print(f"frame {frame}: t={step}")
+        elif args.command == "show":
+            frame = reader.resolve_frame(args.step, args.frame)
+            table = reader.distance_table(args.router, frame=frame)
+            print(format_distance_table(args.router, reader.router_names, table,
+                                        reader.step_labels[frame]))
+        elif args.command == "last-change":
+            change = reader.last_route_change(args.router, args.dest, args.step, args.frame)
+            if change is None:
+                print(f"Route of router {args.router} to {args.dest} never changed")
+            else:
+                frame, step, old_route, new_route = change
+                print(f"Route of router {args.router} to {args.dest} last changed at t={step} "
+                      f"(frame {frame}): {_format_route(old_route)} -> {_format_route(new_route)}")
+    except KeyError as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, struct.error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if reader is not None:
+            reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())